@@ -1,21 +1,94 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-DATABASE_URL = "sqlite:///./crm.db"
+DATABASE_URL = "sqlite+aiosqlite:///./crm.db"
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
+# aiosqlite defaults to NullPool (re-open the DB file on every checkout); keep a
+# bounded set of connections instead. With WAL (below) pooled connections can
+# read concurrently while one of them writes.
+engine = create_async_engine(
+    DATABASE_URL,
+    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {},
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=20,
+    max_overflow=10,
+    pool_timeout=30,
+    pool_pre_ping=True,
+    pool_recycle=3600,
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# SQLite tuning: WAL lets readers run alongside a writer and NORMAL sync skips
+# the per-commit fsync that FULL does (still durable across app crashes).
+if DATABASE_URL.startswith("sqlite"):
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_sqlite_pragma(dbapi_conn, conn_record):
+        cur = dbapi_conn.cursor()
+        cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute("PRAGMA synchronous=NORMAL")
+        cur.execute("PRAGMA foreign_keys=ON")
+        cur.execute("PRAGMA cache_size=-64000")  # 64MB page cache
+        cur.execute("PRAGMA temp_store=MEMORY")
+        cur.execute("PRAGMA mmap_size=268435456")  # 256MB
+        cur.close()
+
+SessionLocal = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 class Base(DeclarativeBase):
     pass  # ✅ THIS MUST BE INDENTED
 
-# Dependency for FastAPI routes
-def get_db():  # ✅ Function header (no indent here)
-    db = SessionLocal()  # ✅ Indented block
+def add_missing_server_defaults(conn):
+    """
+    SQLite can't ALTER a column's DEFAULT, so a table created before a
+    server_default was declared is rebuilt (rows copied over) to pick it up.
+    Run with a sync connection via run_sync; no-op once the schema matches.
+    """
+    if conn.dialect.name != "sqlite":
+        return
+    insp = inspect(conn)
+    stale = []
+    for table in Base.metadata.sorted_tables:
+        if not insp.has_table(table.name):
+            continue
+        live = {c["name"]: c for c in insp.get_columns(table.name)}
+        if any(
+            col.server_default is not None and col.name in live and live[col.name]["default"] is None
+            for col in table.columns
+        ):
+            extra = [name for name in live if name not in table.c]
+            if extra:
+                # The rebuild would silently drop these columns and their data
+                raise RuntimeError(f"{table.name}: unmapped columns {extra}; migrate manually")
+            stale.append((table, list(live)))
+    if not stale:
+        return
+
+    # Standard SQLite table rebuild: FKs off so dropping the old copy doesn't
+    # cascade/fail, legacy rename so other tables' FKs keep the original name.
+    conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+    conn.exec_driver_sql("PRAGMA legacy_alter_table=ON")
     try:
-        yield db
+        conn.exec_driver_sql("BEGIN")
+        for table, columns in stale:
+            old = f"{table.name}__old"
+            cols = ", ".join(f'"{c}"' for c in columns)
+            for index in insp.get_indexes(table.name):
+                conn.exec_driver_sql(f'DROP INDEX "{index["name"]}"')
+            conn.exec_driver_sql(f'ALTER TABLE "{table.name}" RENAME TO "{old}"')
+            table.create(conn)
+            conn.exec_driver_sql(f'INSERT INTO "{table.name}" ({cols}) SELECT {cols} FROM "{old}"')
+            conn.exec_driver_sql(f'DROP TABLE "{old}"')
+        conn.commit()
+    except Exception:
+        # Leave the transaction before the PRAGMAs below (foreign_keys is a no-op inside one)
+        conn.rollback()
+        raise
     finally:
-        db.close()
+        conn.exec_driver_sql("PRAGMA legacy_alter_table=OFF")
+        conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+
+# Dependency for FastAPI routes
+async def get_db():  # ✅ Function header (no indent here)
+    async with SessionLocal() as db:  # ✅ Indented block
+        yield db
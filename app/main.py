@@ -1,19 +1,30 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Security
+from fastapi import FastAPI, BackgroundTasks, Depends, HTTPException, status, Security
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.openapi.utils import get_openapi
+from fastapi.concurrency import run_in_threadpool
 
-from sqlalchemy.orm import Session
+from pydantic import TypeAdapter
+from sqlalchemy import exists, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import raiseload, undefer
 from sqlalchemy.exc import IntegrityError
 
 
 from urllib.parse import quote_plus
 from datetime import timedelta, datetime
+import logging
 import secrets
+import time
+from dataclasses import dataclass
 
-from jose import JWTError, jwt
+from cachetools import TTLCache
 
-from .database import Base, engine, get_db
+import jwt
+from jwt import PyJWTError
+
+from .database import Base, engine, get_db, add_missing_server_defaults
 from .models import User, Patient, Consultation
 from .schemas import (
     RegisterUser, UserOut, LoginRequest, TokenResponse,
@@ -22,15 +33,18 @@ from .schemas import (
     ConsultationShareRequest, ConsultationShareResponse, WhatsAppLinkResponse
 )
 from .utils import (
-    hash_password, verify_password, create_access_token,
+    hash_password, verify_and_update_password, create_access_token,
     SECRET_KEY, ALGORITHM
 )
 
+logger = logging.getLogger(__name__)
+
 # -------------------- App & CORS --------------------
 app = FastAPI(
     title="Prakvedaa CRM API",
     version="0.1.0",
     swagger_ui_parameters={"persistAuthorization": True},  # keep token in UI
+    default_response_class=ORJSONResponse,  # orjson: much faster JSON encoding for list endpoints
 )
 
 app.add_middleware(
@@ -50,9 +64,34 @@ app.add_middleware(
 # -------------------- Security --------------------
 bearer_scheme = HTTPBearer(auto_error=False)
 
-def get_current_user(
+# Verified token payloads, keyed by the raw token, so repeat requests skip the
+# HMAC check. Entries past their own "exp" are re-decoded (and rejected).
+_token_cache: TTLCache = TTLCache(maxsize=4096, ttl=60)
+
+def decode_token(token: str) -> dict:
+    payload = _token_cache.get(token)
+    if payload is not None and payload.get("exp", 0) > time.time():
+        return payload
+    _token_cache.pop(token, None)
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    _token_cache[token] = payload
+    return payload
+
+# Authenticated user as seen by the routes: a plain snapshot, not a session-bound
+# ORM object, so it can be cached across requests.
+@dataclass(frozen=True, slots=True)
+class UserCtx:
+    id: int
+    name: str
+    email: str
+    role: str
+
+# email -> UserCtx; drop the entry from any endpoint that changes a user's role/email
+_user_cache: TTLCache = TTLCache(maxsize=1024, ttl=60)
+
+async def get_current_user(
     creds: HTTPAuthorizationCredentials = Security(bearer_scheme),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     if not creds or not creds.scheme:
         raise HTTPException(status_code=401, detail="Missing or invalid token")
@@ -64,16 +103,21 @@ def get_current_user(
         token = token.split()[-1]
 
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         user_email: str | None = payload.get("sub")
         if not user_email:
             raise HTTPException(status_code=401, detail="Invalid token payload")
-    except JWTError:
+    except PyJWTError:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
-    user = db.query(User).filter(User.email == user_email).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
+    user = _user_cache.get(user_email)
+    if user is None:
+        row = (
+            await db.execute(select(User.id, User.name, User.email, User.role).where(User.email == user_email))
+        ).first()
+        if not row:
+            raise HTTPException(status_code=401, detail="User not found")
+        user = _user_cache[user_email] = UserCtx(id=row.id, name=row.name, email=row.email, role=row.role)
     return user
 
 # Show a single global 🔒 Authorize button
@@ -98,8 +142,25 @@ app.openapi = custom_openapi
 
 # -------------------- Lifecycle --------------------
 @app.on_event("startup")
-def on_startup():
-    Base.metadata.create_all(bind=engine)
+async def on_startup():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with engine.connect() as conn:
+        # e.g. created_at moved to server_default=now(); older DB files lack the DEFAULT
+        await conn.run_sync(add_missing_server_defaults)
+    async with engine.begin() as conn:
+        # create_all skips tables that already exist, so back-fill any newer indexes
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                await conn.run_sync(index.create, checkfirst=True)
+
+    # All routes are registered by now; build the schema so no /docs hit pays for it
+    app.openapi_schema = custom_openapi()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    # Pooled aiosqlite connections each hold a worker thread; close them so the process can exit
+    await engine.dispose()
 
 # -------------------- Health --------------------
 @app.get("/health")
@@ -108,27 +169,39 @@ def health():
 
 # -------------------- Auth --------------------
 @app.post("/register", response_model=UserOut, status_code=status.HTTP_201_CREATED)
-def register(payload: RegisterUser, db: Session = Depends(get_db)):
+async def register(payload: RegisterUser, db: AsyncSession = Depends(get_db)):
     user = User(
         name=payload.name,
         email=payload.email.lower().strip(),
-        password_hash=hash_password(payload.password),
+        password_hash=await run_in_threadpool(hash_password, payload.password),  # keep KDF off the event loop
         role=payload.role,
     )
     db.add(user)
     try:
-        db.commit()
-        db.refresh(user)
+        await db.commit()
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail="Email already registered")
     return user
 
 @app.post("/login", response_model=TokenResponse)
-def login(payload: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == payload.email.lower().strip()).first()
-    if not user or not verify_password(payload.password, user.password_hash):
+async def login(payload: LoginRequest, db: AsyncSession = Depends(get_db)):
+    user = (
+        await db.execute(
+            select(User)
+            .options(undefer(User.password_hash))
+            .where(User.email == payload.email.lower().strip())
+        )
+    ).scalar_one_or_none()
+    if not user:
         raise HTTPException(status_code=400, detail="Invalid email or password")
+    ok, new_hash = await run_in_threadpool(verify_and_update_password, payload.password, user.password_hash)
+    if not ok:
+        raise HTTPException(status_code=400, detail="Invalid email or password")
+    if new_hash:
+        # upgrade legacy pbkdf2 hashes to argon2 transparently
+        user.password_hash = new_hash
+        await db.commit()
 
     access_token = create_access_token(
         data={"sub": user.email, "role": user.role},
@@ -141,11 +214,17 @@ def login(payload: LoginRequest, db: Session = Depends(get_db)):
     }
 
 # -------------------- Patients --------------------
+# Columns PatientOut needs; list endpoints select just these (no ORM hydration)
+PATIENT_OUT_COLUMNS = (
+    Patient.id, Patient.name, Patient.age, Patient.contact, Patient.notes,
+    Patient.created_by, Patient.assigned_doctor_email,
+)
+
 @app.post("/patients/create", response_model=PatientOut)
-def create_patient(
+async def create_patient(
     payload: PatientCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: UserCtx = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
     if current_user.role != "sales":
         raise HTTPException(status_code=403, detail="Only sales role can create patients")
@@ -158,57 +237,72 @@ def create_patient(
         created_by=current_user.email,
     )
     db.add(patient)
-    db.commit()
-    db.refresh(patient)
+    await db.commit()
     return patient
 
 @app.get("/patients/list", response_model=list[PatientOut])
-def list_patients(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def list_patients(current_user: UserCtx = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     # Sales sees all; Doctor sees only assigned to them
     if current_user.role == "sales":
-        patients = db.query(Patient).order_by(Patient.id.desc()).all()
+        patients = (await db.execute(select(*PATIENT_OUT_COLUMNS).order_by(Patient.id.desc()))).all()
     elif current_user.role == "doctor":
         patients = (
-            db.query(Patient)
-            .filter(Patient.assigned_doctor_email == current_user.email)
-            .order_by(Patient.id.desc())
-            .all()
-        )
+            await db.execute(
+                select(*PATIENT_OUT_COLUMNS)
+                .where(Patient.assigned_doctor_email == current_user.email)
+                .order_by(Patient.id.desc())
+            )
+        ).all()
     else:
         raise HTTPException(status_code=403, detail="Role not permitted")
     return patients
 
 @app.post("/patients/assign", response_model=PatientOut)
-def assign_patient(
+async def assign_patient(
     payload: AssignPatientRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserCtx = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     if current_user.role != "sales":
         raise HTTPException(status_code=403, detail="Only sales can assign patients")
 
-    patient = db.query(Patient).filter(Patient.id == payload.patient_id).first()
+    # Validate doctor (exists & role) and assign in a single UPDATE ... RETURNING
+    doctor_email = payload.doctor_email.lower().strip()
+    stmt = (
+        update(Patient)
+        .where(
+            Patient.id == payload.patient_id,
+            exists().where(User.email == doctor_email, User.role == "doctor"),
+        )
+        .values(assigned_doctor_email=doctor_email)
+        .returning(Patient)
+    )
+    patient = (await db.execute(stmt)).scalar_one_or_none()
     if not patient:
-        raise HTTPException(status_code=404, detail="Patient not found")
-
-    # validate doctor exists & role
-    doctor = db.query(User).filter(User.email == payload.doctor_email.lower().strip()).first()
-    if not doctor or doctor.role != "doctor":
+        # Nothing updated: work out which precondition failed
+        found = (await db.execute(select(Patient.id).where(Patient.id == payload.patient_id))).first()
+        if not found:
+            raise HTTPException(status_code=404, detail="Patient not found")
         raise HTTPException(status_code=400, detail="Doctor email invalid or not a doctor")
 
-    patient.assigned_doctor_email = doctor.email
-    db.commit()
-    db.refresh(patient)
+    await db.commit()
     return patient
 
 # -------------------- Consultations --------------------
+# Columns ConsultationOut needs
+CONSULTATION_OUT_COLUMNS = (
+    Consultation.id, Consultation.patient_id, Consultation.scheduled_at, Consultation.video_url,
+    Consultation.created_by, Consultation.status, Consultation.doctor_notes,
+)
+_CONS_LIST_ADAPTER = TypeAdapter(list[ConsultationOut])
+
 @app.post("/consultations/schedule", response_model=ConsultationOut)
-def schedule_consultation(
+async def schedule_consultation(
     payload: ScheduleConsultationRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserCtx = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    patient = db.query(Patient).filter(Patient.id == payload.patient_id).first()
+    patient = (await db.execute(select(Patient).where(Patient.id == payload.patient_id))).scalar_one_or_none()
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
 
@@ -228,173 +322,179 @@ def schedule_consultation(
         created_by=current_user.email
     )
     db.add(consultation)
-    db.commit()
-    db.refresh(consultation)
+    await db.commit()
     return consultation
 
-@app.get("/consultations/list", response_model=list[ConsultationOut])
-def list_consultations(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+@app.get(
+    "/consultations/list",
+    response_model=None,  # serialized below; keep the schema in the docs via `responses`
+    responses={200: {"model": list[ConsultationOut]}},
+)
+async def list_consultations(current_user: UserCtx = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     """
     Sales → sees all consultations.
     Doctor → sees consultations for patients assigned to that doctor only.
     """
     if current_user.role == "sales":
-        consultations = db.query(Consultation).order_by(Consultation.id.desc()).all()
-        return consultations
-
-    if current_user.role == "doctor":
         consultations = (
-            db.query(Consultation)
-            .join(Patient, Patient.id == Consultation.patient_id)
-            .filter(Patient.assigned_doctor_email == current_user.email)
-            .order_by(Consultation.id.desc())
-            .all()
-        )
-        return consultations
+            await db.execute(select(*CONSULTATION_OUT_COLUMNS).order_by(Consultation.id.desc()))
+        ).all()
+    elif current_user.role == "doctor":
+        consultations = (
+            await db.execute(
+                select(*CONSULTATION_OUT_COLUMNS)
+                .join(Patient, Patient.id == Consultation.patient_id)
+                .where(Patient.assigned_doctor_email == current_user.email)
+                .order_by(Consultation.id.desc())
+            )
+        ).all()
+    else:
+        raise HTTPException(status_code=403, detail="Role not permitted")
 
-    raise HTTPException(status_code=403, detail="Role not permitted")
+    # Validate + encode in one pydantic-core pass instead of FastAPI's validate/encode/re-serialize
+    body = _CONS_LIST_ADAPTER.dump_json(_CONS_LIST_ADAPTER.validate_python(consultations, from_attributes=True))
+    return Response(content=body, media_type="application/json")
 
 # -------------------- Sharing (message + WhatsApp link) --------------------
-@app.post("/consultations/share-message", response_model=ConsultationShareResponse)
-def share_message(
-    payload: ConsultationShareRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    cons = db.query(Consultation).filter(Consultation.id == payload.consultation_id).first()
-    if not cons:
-        raise HTTPException(status_code=404, detail="Consultation not found")
-
-    patient = db.query(Patient).filter(Patient.id == cons.patient_id).first()
-    if not patient:
-        raise HTTPException(status_code=404, detail="Patient not found")
-
-    if current_user.role == "doctor" and patient.assigned_doctor_email != current_user.email:
-        raise HTTPException(status_code=403, detail="Not allowed to share this consultation")
-
-    when_str = cons.scheduled_at.isoformat() if cons.scheduled_at else "Now"
-    doc_str = patient.assigned_doctor_email or "TBD"
-
-    msg = (
-        f"Hello {patient.name}, your video consultation is scheduled.\n"
-        f"🔗 Link: {cons.video_url}\n"
-        f"👨‍⚕️ Doctor: {doc_str}\n"
-        f"🕒 Time: {when_str}\n"
-        f"— Sent by {current_user.email}"
-    )
-    return ConsultationShareResponse(message=msg)
-
-@app.post("/consultations/whatsapp-link", response_model=WhatsAppLinkResponse)
-def whatsapp_link(
-    payload: ConsultationShareRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    cons = db.query(Consultation).filter(Consultation.id == payload.consultation_id).first()
-    if not cons:
+async def _get_consultation_with_patient(db: AsyncSession, consultation_id: int) -> tuple[Consultation, Patient]:
+    # One SELECT for both rows; raiseload("*") makes any accidental lazy load fail loudly
+    row = (
+        await db.execute(
+            select(Consultation, Patient)
+            .join(Patient, Patient.id == Consultation.patient_id)
+            .options(raiseload("*"))
+            .where(Consultation.id == consultation_id)
+        )
+    ).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Consultation not found")
+    return row[0], row[1]
 
-    patient = db.query(Patient).filter(Patient.id == cons.patient_id).first()
-    if not patient:
-        raise HTTPException(status_code=404, detail="Patient not found")
-
-    if current_user.role == "doctor" and patient.assigned_doctor_email != current_user.email:
-        raise HTTPException(status_code=403, detail="Not allowed to share this consultation")
+_PHONE_STRIP = str.maketrans("", "", "+ ")  # drop "+" and spaces in one C-level pass
 
-    when_str = cons.scheduled_at.isoformat() if cons.scheduled_at else "Now"
-    doc_str = patient.assigned_doctor_email or "TBD"
+_SHARE_MSG = (
+    "Hello {name}, your video consultation is scheduled.\n"
+    "🔗 Link: {link}\n"
+    "👨‍⚕️ Doctor: {doctor}\n"
+    "🕒 Time: {when}\n"
+    "— Sent by {sender}"
+)
+_WA_MSG = (
+    "Hello {name}, your video consultation is scheduled.\n"
+    "Link: {link}\n"
+    "Doctor: {doctor}\n"
+    "Time: {when}"
+)
 
-    msg = (
-        f"Hello {patient.name}, your video consultation is scheduled.\n"
-        f"Link: {cons.video_url}\n"
-        f"Doctor: {doc_str}\n"
-        f"Time: {when_str}"
-    )
-    encoded = quote_plus(msg)
+def _format_msg(patient: Patient, cons: Consultation, sender: str | None = None) -> str:
+    # With a sender: the copy/paste text (share-message); without: the WhatsApp body
+    fields = {
+        "name": patient.name,
+        "link": cons.video_url,
+        "doctor": patient.assigned_doctor_email or "TBD",
+        "when": cons.scheduled_at_iso,
+    }
+    if sender:
+        return _SHARE_MSG.format(sender=sender, **fields)
+    return _WA_MSG.format(**fields)
 
+def _wa_phone(payload: ConsultationShareRequest, patient: Patient) -> str:
     phone = None
-    if hasattr(payload, "phone_e164") and payload.phone_e164:
+    if payload.phone_e164:  # always declared on ConsultationShareRequest
         phone = payload.phone_e164
     elif patient.contact:
-        phone = patient.contact.replace("+", "").replace(" ", "")
+        phone = patient.contact.translate(_PHONE_STRIP)
 
     if not phone:
         raise HTTPException(status_code=400, detail="No phone provided and patient.contact empty")
+    return phone
+
+def _wa_link(phone: str, msg: str) -> str:
+    # ✅ Final one-click redirect link
+    return f"https://wa.me/{phone}?text={quote_plus(msg)}"
 
-    wa = f"https://wa.me/{phone}?text={encoded}"
-    return WhatsAppLinkResponse(wa_link=wa)
+def send_whatsapp_api(phone: str, msg: str) -> None:
+    # Runs after the response is sent (BackgroundTasks). No WhatsApp Business API
+    # client exists yet, so nothing is sent; plug the real call in here.
+    logger.warning("WhatsApp API not configured; not sending to ***%s", phone[-4:])  # no full number (PII)
 
-@app.post("/consultations/send-whatsapp", response_model=WhatsAppLinkResponse)
-def whatsapp_send_direct(
+@app.post("/consultations/share-message", response_model=ConsultationShareResponse)
+async def share_message(
     payload: ConsultationShareRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserCtx = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    cons = db.query(Consultation).filter(Consultation.id == payload.consultation_id).first()
-    if not cons:
-        raise HTTPException(status_code=404, detail="Consultation not found")
-
-    patient = db.query(Patient).filter(Patient.id == cons.patient_id).first()
-    if not patient:
-        raise HTTPException(status_code=404, detail="Patient not found")
+    cons, patient = await _get_consultation_with_patient(db, payload.consultation_id)
 
     if current_user.role == "doctor" and patient.assigned_doctor_email != current_user.email:
         raise HTTPException(status_code=403, detail="Not allowed to share this consultation")
 
-    when_str = cons.scheduled_at.isoformat() if cons.scheduled_at else "Now"
-    doc_str = patient.assigned_doctor_email or "TBD"
+    return ConsultationShareResponse(message=_format_msg(patient, cons, sender=current_user.email))
 
-    msg = (
-        f"Hello {patient.name}, your video consultation is scheduled.\n"
-        f"Link: {cons.video_url}\n"
-        f"Doctor: {doc_str}\n"
-        f"Time: {when_str}"
-    )
-    encoded = quote_plus(msg)
+@app.post("/consultations/whatsapp-link", response_model=WhatsAppLinkResponse)
+async def whatsapp_link(
+    payload: ConsultationShareRequest,
+    current_user: UserCtx = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    cons, patient = await _get_consultation_with_patient(db, payload.consultation_id)
 
-    phone = None
-    if hasattr(payload, "phone_e164") and payload.phone_e164:
-        phone = payload.phone_e164
-    elif patient.contact:
-        phone = patient.contact.replace("+", "").replace(" ", "")
+    if current_user.role == "doctor" and patient.assigned_doctor_email != current_user.email:
+        raise HTTPException(status_code=403, detail="Not allowed to share this consultation")
 
-    if not phone:
-        raise HTTPException(status_code=400, detail="No phone provided and patient.contact empty")
+    return WhatsAppLinkResponse(wa_link=_wa_link(_wa_phone(payload, patient), _format_msg(patient, cons)))
 
-    # ✅ Final one-click redirect link
-    wa = f"https://wa.me/{phone}?text={encoded}"
-    return WhatsAppLinkResponse(wa_link=wa)
+@app.post(
+    "/consultations/send-whatsapp",
+    response_model=WhatsAppLinkResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def whatsapp_send_direct(
+    payload: ConsultationShareRequest,
+    background_tasks: BackgroundTasks,
+    current_user: UserCtx = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    cons, patient = await _get_consultation_with_patient(db, payload.consultation_id)
+
+    if current_user.role == "doctor" and patient.assigned_doctor_email != current_user.email:
+        raise HTTPException(status_code=403, detail="Not allowed to share this consultation")
+
+    phone = _wa_phone(payload, patient)
+    msg = _format_msg(patient, cons)
+    # Outgoing send happens after the response; the client gets the link right away
+    background_tasks.add_task(send_whatsapp_api, phone, msg)
+    return WhatsAppLinkResponse(wa_link=_wa_link(phone, msg))
 
 # --- Users (list, optional role filter) ---
 from typing import Optional
 from fastapi import Query
 
 @app.get("/users", response_model=list[UserOut])
-def list_users(
+async def list_users(
     role: Optional[str] = Query(None, description="Filter by role, e.g. 'doctor' or 'sales'"),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: UserCtx = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
-    q = db.query(User)
+    # Only the UserOut columns; never pull password_hash for a listing
+    q = select(User.id, User.name, User.email, User.role)
     if role:
-        q = q.filter(User.role == role)
-    return q.order_by(User.id.desc()).all()
+        q = q.where(User.role == role)
+    rows = (await db.execute(q.order_by(User.id.desc()))).all()
+    return [UserOut(id=r.id, name=r.name, email=r.email, role=r.role) for r in rows]
 from fastapi import  Body
 
 @app.patch("/consultations/update", response_model=ConsultationOut)
-def update_consultation(
+async def update_consultation(
     consultation_id: int,
     notes: str = Body(None, embed=True),
     status: str = Body(None, embed=True),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserCtx = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    consultation = db.query(Consultation).filter(Consultation.id == consultation_id).first()
-    if not consultation:
-        raise HTTPException(status_code=404, detail="Consultation not found")
+    consultation, patient = await _get_consultation_with_patient(db, consultation_id)
 
     # ✅ Allow Doctor assigned OR Sales to update
-    patient = db.query(Patient).filter(Patient.id == consultation.patient_id).first()
     if current_user.role == "doctor" and patient.assigned_doctor_email != current_user.email:
         raise HTTPException(status_code=403, detail="Not allowed to update this consultation")
 
@@ -406,10 +506,7 @@ def update_consultation(
     if status is not None:
         consultation.status = status.lower()
 
-    db.commit()
-    db.refresh(consultation)  # ✅ returns updated object
-
-    db.refresh(consultation)
+    await db.commit()  # expire_on_commit=False keeps the updated values loaded
     return consultation  # ✅ This ensures status + notes go to frontend
 
 
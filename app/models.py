@@ -1,7 +1,9 @@
 from datetime import datetime
 from sqlalchemy import Column, Integer, String, DateTime
 from .database import Base
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.orm import deferred
+from sqlalchemy.sql import func
 from datetime import datetime
 
 
@@ -11,14 +13,18 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(120), nullable=False)
     email = Column(String(255), unique=True, nullable=False, index=True)
-    password_hash = Column(String(255), nullable=False)
+    password_hash = deferred(Column(String(255), nullable=False))  # only loaded when asked for (login)
     role = Column(String(50), nullable=False, default="sales")  # sales | doctor | admin
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
 from sqlalchemy import Column, Integer, String, DateTime
 from datetime import datetime
 
 class Patient(Base):
     __tablename__ = "patients"
+    __table_args__ = (
+        # Doctor's patient list: WHERE assigned_doctor_email = ? ORDER BY id DESC
+        Index("ix_pat_doc_id", "assigned_doctor_email", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(120), nullable=False)
@@ -27,7 +33,7 @@ class Patient(Base):
     notes = Column(String(255), nullable=True)
     created_by = Column(String(255), nullable=False)
     assigned_doctor_email = Column(String(255), nullable=True)  # 👈 NEW
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
 
 # ✅ FINAL Consultation Model (Keep ONLY this one)
 from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
@@ -35,7 +41,11 @@ from datetime import datetime
 
 class Consultation(Base):
     __tablename__ = "consultations"
-    __table_args__ = {'extend_existing': True}  # prevents metadata clash
+    __table_args__ = (
+        # Consultations per patient (doctor list join) ORDER BY id DESC
+        Index("ix_cons_patient_id_id", "patient_id", "id"),
+        {'extend_existing': True},  # prevents metadata clash
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     patient_id = Column(Integer, ForeignKey("patients.id"), nullable=False)
@@ -44,5 +54,10 @@ class Consultation(Base):
     created_by = Column(String(255), nullable=False)
     status = Column(String(50), default="pending")   # pending | completed
     doctor_notes = Column(Text, nullable=True)       # doctor's final notes/prescription
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+    @property
+    def scheduled_at_iso(self) -> str:
+        # Display form used in share messages; unscheduled means "Now"
+        return self.scheduled_at.isoformat() if self.scheduled_at else "Now"
 
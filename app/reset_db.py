@@ -1,6 +1,15 @@
+import asyncio
+
 from app.database import Base, engine
 
+
+async def reset():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    await engine.dispose()
+
+
 print("🔧 Resetting database...")
-Base.metadata.drop_all(bind=engine)
-Base.metadata.create_all(bind=engine)
+asyncio.run(reset())
 print("✅ Database reset successful.")
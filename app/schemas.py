@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
 from typing import Literal, Optional, List
 from datetime import datetime
 
@@ -17,8 +17,7 @@ class UserOut(BaseModel):
     email: EmailStr
     role: Role
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 class LoginRequest(BaseModel):
     email: EmailStr
     password: str
@@ -43,8 +42,7 @@ class PatientOut(BaseModel):
     created_by: str
     assigned_doctor_email: Optional[EmailStr] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # 👉 Create request model for assigning a doctor
 class AssignPatientRequest(BaseModel):
@@ -70,8 +68,7 @@ class ConsultationOut(BaseModel):
     status: Optional[str] = "pending"           # 👈 NOW INCLUDED
     doctor_notes: Optional[str] = None          # 👈 NOW INCLUDED
 
-    class Config:
-        orm_mode = True  # ✅ This ensures ORM fields like doctor_notes/status are serialized
+    model_config = ConfigDict(from_attributes=True)  # ✅ This ensures ORM fields like doctor_notes/status are serialized
 
 
 class ConsultationShareRequest(BaseModel):
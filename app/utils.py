@@ -1,8 +1,16 @@
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
-from jose import jwt
+import jwt
 
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")  # ✅ Changed here
+# argon2id (argon2-cffi, releases the GIL) for new hashes; pbkdf2_sha256 is kept
+# only so existing users can still log in and get rehashed on their next login.
+pwd_context = CryptContext(
+    schemes=["argon2", "pbkdf2_sha256"],
+    deprecated="auto",
+    argon2__memory_cost=19456,
+    argon2__time_cost=2,
+    argon2__parallelism=1,
+)
 
 SECRET_KEY = "your_secret_key_here_change_later"
 ALGORITHM = "HS256"
@@ -14,6 +22,10 @@ def hash_password(plain_password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)  # ✅ clean verify
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    # Returns (ok, new_hash); new_hash is set when the stored hash uses a deprecated scheme
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))